@@ -1,17 +1,46 @@
 import torch
 import torch.nn as nn
-import torchvision.transforms as transforms
+import torch.nn.functional as F
 from transformers import AutoModel, AutoTokenizer
 import cv2
 import numpy as np
-import librosa
+import torchaudio
 import soundfile as sf
-from PIL import Image
 import logging
-from typing import List, Dict, Tuple, Optional
+from typing import Iterable, Iterator, List, Dict, Tuple, Optional
 import asyncio
 from datetime import datetime
 import json
+import copy
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# HSV range for fire colors (red/orange)
+FIRE_LOWER = np.array([0, 50, 50], dtype=np.uint8)
+FIRE_UPPER = np.array([20, 255, 255], dtype=np.uint8)
+
+# Run colour thresholding through OpenCL (transparent API) when a device exists
+USE_OPENCL = cv2.ocl.haveOpenCL()
+
+def preprocess_frames(frames: torch.Tensor) -> torch.Tensor:
+    """Resize + normalize a (B, H, W, 3) uint8 RGB batch into (B, 3, 224, 224) fp16"""
+    x = frames.permute(0, 3, 1, 2).float() / 255.0
+    x = F.interpolate(x, size=(224, 224), mode="bilinear", align_corners=False)
+    mean = torch.tensor([0.485, 0.456, 0.406], device=x.device).view(1, 3, 1, 1)
+    std = torch.tensor([0.229, 0.224, 0.225], device=x.device).view(1, 3, 1, 1)
+    return ((x - mean) / std).half()
+
+def open_video_capture(source) -> cv2.VideoCapture:
+    """Open a video source, decoding on the GPU (NVDEC/VA-API/...) when available"""
+    cap = cv2.VideoCapture(
+        source, cv2.CAP_FFMPEG,
+        [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+    )
+    if not cap.isOpened():
+        # Non-FFmpeg sources (e.g. local cameras) use the default backend
+        cap = cv2.VideoCapture(source)
+    return cap
 
 class MultimodalDetector:
     """
@@ -19,12 +48,17 @@ class MultimodalDetector:
     Combines computer vision and audio processing
     """
     
-    def __init__(self):
+    def __init__(self, notifier=None):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.logger = logging.getLogger(__name__)
         
+        # Initialized NotificationService shared with the app; without one,
+        # each incident is sent through a short-lived service
+        self.notifier = notifier
+        
         # Initialize models
         self.video_model = None
+        self.video_graph = None
         self.audio_model = None
         self.fusion_model = None
         
@@ -36,13 +70,11 @@ class MultimodalDetector:
             "emergency": 0.9
         }
         
-        # Image preprocessing
-        self.image_transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], 
-                               std=[0.229, 0.224, 0.225])
-        ])
+        # Number of sampled frames sent to the video model per call
+        self.batch_size = 8
+        
+        # Image preprocessing (batched tensor ops, no PIL round-trip)
+        self.image_transform = preprocess_frames
         
     async def initialize(self):
         """Initialize all AI models"""
@@ -61,18 +93,85 @@ class MultimodalDetector:
             # Using YOLOv8 for object detection and classification
             from ultralytics import YOLO
             
-            # Load pre-trained YOLOv8 model
-            self.video_model = YOLO('yolov8n.pt')
+            # Load pre-trained YOLOv8 model (or an exported TensorRT engine,
+            # see ai/export_engine.py)
+            weights = os.getenv("VIDEO_MODEL_PATH", "yolov8n.pt")
+            self.video_model = YOLO(weights)
             
             # Custom classes for our use case
             self.traffic_classes = ['car', 'truck', 'bus', 'motorcycle', 'bicycle', 'person']
             self.crime_classes = ['person', 'knife', 'gun', 'fire']
             
+            # TensorRT engines are already compiled; only graph-capture PyTorch weights
+            if torch.cuda.is_available() and weights.endswith(".pt"):
+                self._capture_video_graph()
+            
             self.logger.info("Video model loaded successfully")
         except Exception as e:
             self.logger.error(f"Failed to load video model: {e}")
             raise
     
+    def _capture_video_graph(self, imgsz: int = 640):
+        """Capture a fixed-shape (1, 3, imgsz, imgsz) YOLO forward pass as a CUDA Graph"""
+        try:
+            from ultralytics.data.augment import LetterBox
+            
+            # Work on a private half-precision copy so the eager predictor
+            # can never move or recast the weights the graph points at
+            model = copy.deepcopy(self.video_model.model).to(self.device).fuse(verbose=False)
+            model = model.half().eval()
+            
+            static_in = torch.zeros((1, 3, imgsz, imgsz), device=self.device, dtype=torch.float16)
+            
+            # Warm up on a side stream before capture
+            stream = torch.cuda.Stream()
+            stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(stream), torch.no_grad():
+                for _ in range(3):
+                    model(static_in)
+            torch.cuda.current_stream().wait_stream(stream)
+            
+            graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(graph), torch.no_grad():
+                static_out = model(static_in)
+            
+            self.video_graph = {
+                "graph": graph,
+                "model": model,
+                "input": static_in,
+                "output": static_out,
+                "letterbox": LetterBox((imgsz, imgsz), auto=False),
+            }
+            self.logger.info("Video model captured as CUDA graph")
+        except Exception as e:
+            self.video_graph = None
+            self.logger.warning(f"CUDA graph capture failed, using eager inference: {e}")
+    
+    def _run_video_graph(self, image: np.ndarray):
+        """Run the captured video graph on one image and return ultralytics Results
+        
+        Not thread-safe: replays share one static input/output buffer. Each
+        detector is only driven from its own event loop (the app's, or a
+        file-pool process's), so calls never overlap.
+        """
+        from ultralytics.engine.results import Results
+        from ultralytics.utils import ops
+        
+        graph = self.video_graph
+        static_in = graph["input"]
+        
+        # Same preprocessing as the ultralytics predictor: letterbox, BGR->RGB, HWC->CHW
+        padded = graph["letterbox"](image=image)
+        chw = np.ascontiguousarray(padded[..., ::-1].transpose(2, 0, 1))
+        tensor = torch.from_numpy(chw).to(self.device, non_blocking=True)
+        static_in.copy_(tensor.unsqueeze(0)).div_(255.0)
+        
+        graph["graph"].replay()
+        
+        det = ops.non_max_suppression(graph["output"], conf_thres=0.25, iou_thres=0.7)[0]
+        det[:, :4] = ops.scale_boxes(static_in.shape[2:], det[:, :4], image.shape)
+        return [Results(image, path="", names=self.video_model.names, boxes=det)]
+    
     async def _load_audio_model(self):
         """Load audio processing model"""
         try:
@@ -106,8 +205,8 @@ class MultimodalDetector:
                     fused = self.dropout(fused)
                     return self.classifier(fused)
             
-            self.fusion_model = FusionModel()
-            self.fusion_model.to(self.device)
+            # Inference only: eval() turns dropout into identity
+            self.fusion_model = FusionModel().to(self.device).eval()
             self.logger.info("Fusion model loaded successfully")
         except Exception as e:
             self.logger.error(f"Failed to load fusion model: {e}")
@@ -115,93 +214,190 @@ class MultimodalDetector:
     
     async def process_video(self, video_path: str) -> List[Dict]:
         """Process video file and detect incidents"""
-        incidents = []
-        
         try:
-            cap = cv2.VideoCapture(video_path)
-            frame_count = 0
-            
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Process every 30th frame (1 second at 30fps)
-                if frame_count % 30 == 0:
-                    incident = await self._analyze_frame(frame, frame_count)
-                    if incident:
-                        incidents.append(incident)
-                
-                frame_count += 1
-            
-            cap.release()
-            return incidents
+            cap = open_video_capture(video_path)
+            try:
+                return await self.process_frames(self._sample_frames(cap))
+            finally:
+                cap.release()
             
         except Exception as e:
             self.logger.error(f"Error processing video: {e}")
             return []
     
+    @staticmethod
+    def _sample_frames(cap: cv2.VideoCapture, stride: int = 30) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (frame index, frame) for every stride-th frame of a capture"""
+        frame_count = 0
+        while cap.isOpened():
+            # grab() only demuxes; frames are decoded by retrieve() when analyzed
+            if not cap.grab():
+                break
+            
+            # Process every 30th frame (1 second at 30fps)
+            if frame_count % stride == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                yield frame_count, frame
+            
+            frame_count += 1
+    
+    async def process_frames(self, frames: Iterable[Tuple[int, np.ndarray]]) -> List[Dict]:
+        """Detect incidents in (frame index, frame) pairs, batch_size frames per detector call"""
+        incidents = []
+        batch, batch_timestamps = [], []
+        
+        for timestamp, frame in frames:
+            batch.append(frame)
+            batch_timestamps.append(timestamp)
+            if len(batch) == self.batch_size:
+                detections = await self._analyze_batch(batch, batch_timestamps)
+                incidents.extend(d for d in detections if d)
+                batch, batch_timestamps = [], []
+        
+        if batch:
+            detections = await self._analyze_batch(batch, batch_timestamps)
+            incidents.extend(d for d in detections if d)
+        
+        return incidents
+    
     async def process_stream(self, stream_url: str, feed_id: int = None) -> None:
-        """Process live video stream"""
-        try:
-            cap = cv2.VideoCapture(stream_url)
+        """Process live video stream
+        
+        Decoding, inference and incident handling run as separate stages
+        joined by bounded queues, so decoding the next frames overlaps with
+        inference on the current one.
+        """
+        loop = asyncio.get_running_loop()
+        # OpenCV reads block, so they run on a dedicated thread; a single
+        # worker also keeps release() from racing an in-flight read()
+        reader = ThreadPoolExecutor(max_workers=1)
+        frames_q: asyncio.Queue = asyncio.Queue(maxsize=8)
+        incidents_q: asyncio.Queue = asyncio.Queue(maxsize=8)
+        cap = None
+        
+        async def decode():
+            # Live sources block in read()/grab() until the next frame arrives;
+            # local files would otherwise be consumed as fast as they decode,
+            # so they are paced to their own frame rate
+            pace_to_fps = os.path.isfile(stream_url)
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30
+            start = time.monotonic()
             frame_count = 0
-            
             while cap.isOpened():
-                ret, frame = cap.read()
+                # Process every 30th frame; skipped frames are grabbed without decoding
+                if frame_count % 30 == 0:
+                    ret, frame = await loop.run_in_executor(reader, cap.read)
+                else:
+                    ret, frame = await loop.run_in_executor(reader, cap.grab), None
                 if not ret:
                     await asyncio.sleep(0.1)
                     continue
                 
-                # Process every 30th frame
-                if frame_count % 30 == 0:
-                    incident = await self._analyze_frame(frame, frame_count, feed_id)
-                    if incident:
-                        await self._handle_incident(incident, feed_id)
+                if frame is not None:
+                    await frames_q.put((frame_count, frame))
                 
                 frame_count += 1
-                await asyncio.sleep(0.033)  # ~30fps
+                if pace_to_fps:
+                    delay = start + frame_count / fps - time.monotonic()
+                    if delay > 1e-3:
+                        await asyncio.sleep(delay)
+            await frames_q.put(None)
+        
+        async def infer():
+            while (item := await frames_q.get()) is not None:
+                frame_count, frame = item
+                incident = await self._analyze_frame(frame, frame_count, feed_id)
+                if incident:
+                    await incidents_q.put(incident)
+            await incidents_q.put(None)
+        
+        async def handle():
+            while (incident := await incidents_q.get()) is not None:
+                await self._handle_incident(incident, feed_id)
+        
+        stages = []
+        try:
+            cap = await loop.run_in_executor(reader, open_video_capture, stream_url)
+            stages = [asyncio.create_task(stage()) for stage in (decode, infer, handle)]
+            await asyncio.gather(*stages)
                 
         except Exception as e:
             self.logger.error(f"Error processing stream: {e}")
+        finally:
+            for stage in stages:
+                stage.cancel()
+            if cap is not None:
+                reader.submit(cap.release)
+            reader.shutdown(wait=False)
     
     async def _analyze_frame(self, frame: np.ndarray, timestamp: int, feed_id: int = None) -> Optional[Dict]:
         """Analyze a single frame for incidents"""
+        detections = await self._analyze_batch([frame], [timestamp], feed_id)
+        return detections[0]
+    
+    async def analyze_batch(self, frames: List[np.ndarray], timestamps: List[int],
+                            feed_ids: List[Optional[int]]) -> List[Optional[Dict]]:
+        """Analyze frames from any mix of feeds with a single detector call"""
+        return await self._analyze_batch(frames, timestamps, feed_ids=feed_ids)
+    
+    async def _analyze_batch(self, frames: List[np.ndarray], timestamps: List[int],
+                             feed_id: int = None,
+                             feed_ids: Optional[List[Optional[int]]] = None) -> List[Optional[Dict]]:
+        """Analyze a batch of frames with a single detector call
+        
+        feed_ids gives each frame's feed when a batch mixes feeds; otherwise
+        every frame belongs to feed_id.
+        """
+        if feed_ids is None:
+            feed_ids = [feed_id] * len(frames)
+        
         try:
-            # Convert BGR to RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # Frames go in as OpenCV BGR: ultralytics treats NumPy images as
+            # BGR and swaps channels in its own preprocessing (as does the
+            # graph path), so no cvtColor pass is needed here
             
-            # Run object detection
-            results = self.video_model(rgb_frame)
+            # Run object detection once for the whole batch; single frames
+            # (live streams) replay the fixed-shape CUDA graph when captured
+            if len(frames) == 1 and self.video_graph is not None:
+                results = self._run_video_graph(frames[0])
+            else:
+                results = self.video_model(frames, verbose=False, half=True)
             
-            incidents = []
+            detections = []
             
-            for result in results:
+            for frame, timestamp, frame_feed_id, result in zip(frames, timestamps, feed_ids, results):
+                incidents = []
                 boxes = result.boxes
                 if boxes is not None:
-                    for box in boxes:
-                        # Extract bounding box and confidence
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        confidence = box.conf[0].cpu().numpy()
-                        class_id = int(box.cls[0].cpu().numpy())
+                    # Extract bounding boxes and confidences with one
+                    # device-to-host copy per tensor rather than three per box
+                    xyxy = boxes.xyxy.cpu().numpy().tolist()
+                    confidences = boxes.conf.cpu().numpy().tolist()
+                    class_ids = boxes.cls.cpu().numpy().astype(int).tolist()
+                    
+                    for bbox, confidence, class_id in zip(xyxy, confidences, class_ids):
                         class_name = self.video_model.names[class_id]
                         
                         # Check for specific incident types
                         incident = await self._classify_incident(
-                            frame, rgb_frame, class_name, confidence, 
-                            [x1, y1, x2, y2], timestamp, feed_id
+                            frame, class_name, confidence, 
+                            bbox, timestamp, frame_feed_id
                         )
                         
                         if incident:
                             incidents.append(incident)
+                
+                detections.append(incidents[0] if incidents else None)
             
-            return incidents[0] if incidents else None
+            return detections
             
         except Exception as e:
-            self.logger.error(f"Error analyzing frame: {e}")
-            return None
+            self.logger.error(f"Error analyzing frames: {e}")
+            return [None] * len(frames)
     
-    async def _classify_incident(self, frame: np.ndarray, rgb_frame: np.ndarray, 
+    async def _classify_incident(self, frame: np.ndarray,
                                class_name: str, confidence: float, 
                                bbox: List[float], timestamp: int, 
                                feed_id: int = None) -> Optional[Dict]:
@@ -294,30 +490,31 @@ class MultimodalDetector:
     
     async def _detect_fire(self, frame: np.ndarray) -> bool:
         """Detect fire in the frame"""
-        # Convert to HSV for better color detection
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        
-        # Define range for fire colors (red/orange)
-        lower_fire = np.array([0, 50, 50])
-        upper_fire = np.array([20, 255, 255])
+        total_pixels = frame.shape[0] * frame.shape[1]
+        image = cv2.UMat(frame) if USE_OPENCL else frame
         
-        # Create mask
-        mask = cv2.inRange(hsv, lower_fire, upper_fire)
+        # Convert to HSV for better color detection
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
         
-        # Count fire-colored pixels
+        # Create mask and count fire-colored pixels
+        mask = cv2.inRange(hsv, FIRE_LOWER, FIRE_UPPER)
         fire_pixels = cv2.countNonZero(mask)
-        total_pixels = frame.shape[0] * frame.shape[1]
         
         # If more than 1% of pixels are fire-colored, consider it fire
-        return (fire_pixels / total_pixels) > 0.01
+        return fire_pixels > total_pixels * 0.01
     
     async def process_audio(self, audio_path: str) -> List[Dict]:
         """Process audio file for incident detection"""
         incidents = []
         
         try:
-            # Load audio file
-            audio, sr = librosa.load(audio_path, sr=16000)
+            # Load audio file as mono and resample to 16 kHz on the model's device
+            waveform, orig_sr = torchaudio.load(audio_path)
+            waveform = waveform.to(self.device).mean(dim=0)
+            sr = 16000
+            if orig_sr != sr:
+                waveform = torchaudio.functional.resample(waveform, orig_sr, sr)
+            audio = waveform.cpu().numpy()
             
             # Extract features
             features = self.audio_feature_extractor(audio, sampling_rate=sr, return_tensors="pt")
@@ -350,14 +547,21 @@ class MultimodalDetector:
         # Analyze frequency content for siren patterns
         # This is a simplified implementation
         
-        # Check for high-frequency content (sirens)
-        fft = np.fft.fft(audio)
-        freqs = np.fft.fftfreq(len(audio), 1/sr)
+        # Check for high-frequency content (sirens). Audio is real, so the
+        # one-sided spectrum carries all the information at half the cost
+        magnitude = np.abs(np.fft.rfft(audio))
+        freqs = np.fft.rfftfreq(len(audio), 1/sr)
         
         # Look for frequencies typical of sirens (800-2000 Hz)
-        siren_range = (freqs >= 800) & (freqs <= 2000)
-        siren_power = np.sum(np.abs(fft[siren_range]))
-        total_power = np.sum(np.abs(fft))
+        lo = np.searchsorted(freqs, 800, side="left")
+        hi = np.searchsorted(freqs, 2000, side="right")
+        siren_power = magnitude[lo:hi].sum()
+        
+        # Power of the full two-sided spectrum: every bin except DC (and
+        # Nyquist for even lengths) appears twice
+        total_power = 2 * magnitude.sum() - magnitude[0]
+        if len(audio) % 2 == 0:
+            total_power -= magnitude[-1]
         
         return (siren_power / total_power) > 0.1
     
@@ -373,9 +577,15 @@ class MultimodalDetector:
             self.logger.info(f"Incident detected: {incident['incident_type']} - {incident['sub_type']}")
             
             # Send to notification service
-            from services.notification_service import NotificationService
-            notification_service = NotificationService()
-            await notification_service.send_incident_notification(incident)
+            if self.notifier is not None:
+                await self.notifier.send_incident_notification(incident)
+            else:
+                from services.notification_service import NotificationService
+                notification_service = NotificationService()
+                try:
+                    await notification_service.send_incident_notification(incident)
+                finally:
+                    await notification_service.cleanup()
             
         except Exception as e:
             self.logger.error(f"Error handling incident: {e}")
@@ -1,82 +1,129 @@
 from ultralytics import YOLO
+import numpy as np
 import cv2
+import os
 
 
-vehicle_model = YOLO('yolov8n.pt')           # General object detection (vehicles)
-helmet_model  = YOLO('helmet-detection.pt')  # Custom helmet detector
+# .pt checkpoints or INT8 TensorRT engines from export_engine.py.
+# COMBINED_MODEL is one checkpoint trained on vehicle + 'helmet' classes: it
+# needs a single backbone pass per frame instead of one per model.
+COMBINED_MODEL = os.getenv('COMBINED_MODEL')
+if COMBINED_MODEL:
+    vehicle_model = YOLO(COMBINED_MODEL)
+    helmet_model  = None
+else:
+    vehicle_model = YOLO(os.getenv('VEHICLE_MODEL', 'yolov8n.pt'))           # General object detection (vehicles)
+    helmet_model  = YOLO(os.getenv('HELMET_MODEL', 'helmet-detection.pt'))  # Custom helmet detector
 
 
-cap = cv2.VideoCapture('traffic.mp4')
-CLASS_NAMES = vehicle_model.model.names
+# Decode on the GPU when FFmpeg has a hardware decoder for the stream
+cap = cv2.VideoCapture('traffic.mp4', cv2.CAP_FFMPEG,
+                       [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+CLASS_NAMES = vehicle_model.names
 
 signal_line_y = 300      # Red line for signal jump detection
 violation_count = 0
 frame_num = 0
+BATCH_SIZE = 8           # Frames sent to each model per call
 
+VEHICLE_IDS = np.array([cls_id for cls_id, name in CLASS_NAMES.items()
+                        if name in ('car', 'bus', 'truck', 'motorbike')], dtype=np.int64)
+HELMET_IDS  = np.array([cls_id for cls_id, name in CLASS_NAMES.items()
+                        if name == 'helmet'], dtype=np.int64)
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
 
-    frame_num += 1
-    annotated = frame.copy()
+def classify_boxes(xyxy, cls_ids, target_ids, signal_y):
+    """Flag vehicle boxes and the ones whose centre is past the signal line."""
+    is_vehicle = np.isin(cls_ids, target_ids)
+    cy = (xyxy[:, 1] + xyxy[:, 3]) // 2
+    violated = is_vehicle & (cy < signal_y - 5)
+    return is_vehicle, violated
+
 
-    # Run YOLO detections
-    vehicle_results = vehicle_model(frame)
-    helmet_results  = helmet_model(frame)
+def annotate(frame, vehicle_result, helmet_xyxy):
+    """Draw detections onto the frame in place and show it. Returns False on quit."""
+    global violation_count, frame_num
+
+    frame_num += 1
 
-    vehicle_count = 0
     helmet_count = 0
 
-  
-    for r in vehicle_results:
-        for box in r.boxes:
-            cls_id = int(box.cls[0])
-            label  = CLASS_NAMES[cls_id]
-            conf   = float(box.conf[0])
-
-            if label in ['car', 'bus', 'truck', 'motorbike']:
-                vehicle_count += 1
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-
-                cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(annotated, f"{label} {conf:.2f}", (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-
-                if cy < signal_line_y - 5:
-                    violation_count += 1
-                    cv2.putText(annotated, "Signal Jump!", (x1, y1 - 30),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-
-
-    for r in helmet_results:
-        for box in r.boxes:
-            helmet_count += 1
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 0, 255), 2)
-            cv2.putText(annotated, "Helmet", (x1, y1 - 10),
+
+    # Copy each result tensor to the host once instead of per box
+    boxes   = vehicle_result.boxes
+    xyxy    = boxes.xyxy.cpu().numpy().astype(np.int64)
+    confs   = boxes.conf.cpu().numpy()
+    cls_ids = boxes.cls.cpu().numpy().astype(np.int64)
+
+    is_vehicle, violated = classify_boxes(xyxy, cls_ids, VEHICLE_IDS, signal_line_y)
+    vehicle_count = int(is_vehicle.sum())
+    violation_count += int(violated.sum())
+
+    # Only drawing is left in Python
+    for i in np.flatnonzero(is_vehicle):
+        x1, y1, x2, y2 = xyxy[i].tolist()
+        label = CLASS_NAMES[int(cls_ids[i])]
+
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, f"{label} {confs[i]:.2f}", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+        if violated[i]:
+            cv2.putText(frame, "Signal Jump!", (x1, y1 - 30),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
 
- 
-    cv2.line(annotated, (0, signal_line_y),
-             (annotated.shape[1], signal_line_y), (0, 0, 255), 2)
 
-    cv2.putText(annotated, f"Vehicles: {vehicle_count}", (20, 40),
+    for x1, y1, x2, y2 in helmet_xyxy.astype(int).tolist():
+        helmet_count += 1
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+        cv2.putText(frame, "Helmet", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+
+
+    cv2.line(frame, (0, signal_line_y),
+             (frame.shape[1], signal_line_y), (0, 0, 255), 2)
+
+    cv2.putText(frame, f"Vehicles: {vehicle_count}", (20, 40),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-    cv2.putText(annotated, f"Helmets: {helmet_count}", (20, 70),
+    cv2.putText(frame, f"Helmets: {helmet_count}", (20, 70),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-    cv2.putText(annotated, f"Violations: {violation_count}", (20, 100),
+    cv2.putText(frame, f"Violations: {violation_count}", (20, 100),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-    cv2.putText(annotated, f"Frame: {frame_num}", (20, 130),
+    cv2.putText(frame, f"Frame: {frame_num}", (20, 130),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
 
-    cv2.imshow("Smart CCTV AI System", annotated)
+    cv2.imshow("Smart CCTV AI System", frame)
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+
+running = True
+while running:
+    frames = []
+    while len(frames) < BATCH_SIZE:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+
+    if not frames:
         break
 
+    # Run YOLO detections once per batch (half precision is ignored on CPU)
+    vehicle_results = vehicle_model(frames, verbose=False, half=True)
+    if helmet_model is not None:
+        helmet_boxes = [r.boxes.xyxy.cpu().numpy()
+                        for r in helmet_model(frames, verbose=False, half=True)]
+    else:
+        # Helmets come out of the same forward pass as the vehicles
+        helmet_boxes = [r.boxes.xyxy.cpu().numpy()[np.isin(r.boxes.cls.cpu().numpy(), HELMET_IDS)]
+                        for r in vehicle_results]
+
+    for frame, vehicle_result, helmet_xyxy in zip(frames, vehicle_results, helmet_boxes):
+        if not annotate(frame, vehicle_result, helmet_xyxy):
+            running = False
+            break
+
 # Cleanup
 
 cap.release()
@@ -0,0 +1,16 @@
+from ultralytics import YOLO
+import sys
+
+# Usage: python export_engine.py [weights.pt] [calibration.yaml]
+# The calibration dataset yaml should point at ~200 representative frames.
+weights = sys.argv[1] if len(sys.argv) > 1 else 'yolov8n.pt'
+data    = sys.argv[2] if len(sys.argv) > 2 else 'calib.yaml'
+
+model = YOLO(weights)
+
+# INT8 TensorRT engine; dynamic batch up to 8 so both single live frames
+# and batched video frames can run on the same engine
+engine_path = model.export(format='engine', int8=True, data=data,
+                           dynamic=True, batch=8, imgsz=640)
+
+print(f"\n✅ Exported INT8 engine: {engine_path}")
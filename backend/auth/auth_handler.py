@@ -1,8 +1,12 @@
-import jwt
+from jose import jwt
 import bcrypt
 from datetime import datetime, timedelta
 from typing import Optional, Dict
+from collections import OrderedDict
+import hashlib
 import os
+import threading
+import time
 from passlib.context import CryptContext
 
 class AuthHandler:
@@ -16,7 +20,23 @@ class AuthHandler:
         self.access_token_expire_minutes = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
         
         # Password hashing context
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.pwd_context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=int(os.getenv("BCRYPT_ROUNDS", "12"))
+        )
+        
+        # LRU of (hash, sha256(password)) pairs that already verified successfully
+        self._verified_cache: OrderedDict = OrderedDict()
+        self._verified_cache_lock = threading.Lock()
+        self._verified_cache_size = 4096
+        
+        # LRU of decoded access tokens: token -> (cached_until, payload).
+        # decode_token runs on FastAPI's threadpool, so access is locked
+        self._token_cache: OrderedDict = OrderedDict()
+        self._token_cache_lock = threading.Lock()
+        self._token_cache_size = 10_000
+        self._token_cache_ttl = 30  # seconds
     
     def hash_password(self, password: str) -> str:
         """Hash a password using bcrypt"""
@@ -24,7 +44,22 @@ class AuthHandler:
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
-        return self.pwd_context.verify(plain_password, hashed_password)
+        key = (hashed_password, hashlib.sha256(plain_password.encode()).digest())
+        with self._verified_cache_lock:
+            if key in self._verified_cache:
+                self._verified_cache.move_to_end(key)
+                return True
+        
+        # bcrypt runs outside the lock so concurrent logins don't queue on it
+        if not self.pwd_context.verify(plain_password, hashed_password):
+            return False
+        
+        # Only successful checks are cached so failed guesses always pay full bcrypt cost
+        with self._verified_cache_lock:
+            self._verified_cache[key] = None
+            if len(self._verified_cache) > self._verified_cache_size:
+                self._verified_cache.popitem(last=False)
+        return True
     
     def create_access_token(self, data: Dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create a JWT access token"""
@@ -41,13 +76,31 @@ class AuthHandler:
     
     def decode_token(self, token: str) -> Dict:
         """Decode and verify a JWT token"""
+        now = time.time()
+        with self._token_cache_lock:
+            cached = self._token_cache.get(token)
+            if cached is not None:
+                if now < cached[0]:
+                    self._token_cache.move_to_end(token)
+                    return cached[1]
+                self._token_cache.pop(token, None)
+        
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
         except jwt.ExpiredSignatureError:
             raise ValueError("Token has expired")
         except jwt.JWTError:
             raise ValueError("Invalid token")
+        
+        # Never serve a cached payload past the token's own expiry
+        cached_until = now + self._token_cache_ttl
+        if "exp" in payload:
+            cached_until = min(cached_until, payload["exp"])
+        with self._token_cache_lock:
+            self._token_cache[token] = (cached_until, payload)
+            if len(self._token_cache) > self._token_cache_size:
+                self._token_cache.popitem(last=False)
+        return payload
     
     def create_refresh_token(self, data: Dict) -> str:
         """Create a refresh token (longer expiry)"""
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 import os
@@ -10,14 +10,35 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./cctv_monitor.db")
 
 # For SQLite (development)
-if DATABASE_URL.startswith("sqlite"):
+if DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+    # In-memory databases only exist per connection, so share a single one
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+elif DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=10,
+        max_overflow=20,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """WAL lets readers proceed while a writer is active"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+elif DATABASE_URL.startswith(("postgresql://", "postgresql+psycopg2://")):
+    # For PostgreSQL (production); psycopg2 batches executemany INSERTs into
+    # multi-row VALUES statements, and other executemany calls via execute_batch
+    engine = create_engine(DATABASE_URL, executemany_mode="values_plus_batch")
 else:
-    # For PostgreSQL (production)
     engine = create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from sqlalchemy.sql import func
 
 Base = declarative_base()
 
@@ -15,7 +15,7 @@ class User(Base):
     full_name = Column(String(100))
     role = Column(String(20), default="operator")  # admin, operator, viewer
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
     last_login = Column(DateTime)
     
     # Relationships
@@ -24,6 +24,8 @@ class User(Base):
 
 class CCTVFeed(Base):
     __tablename__ = "cctv_feeds"
+    # Server defaults (id, timestamps) come back from the INSERT itself
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -33,8 +35,8 @@ class CCTVFeed(Base):
     longitude = Column(Float)
     description = Column(Text)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     created_by = Column(Integer, ForeignKey("users.id"))
     
     # Relationships
@@ -43,6 +45,17 @@ class CCTVFeed(Base):
 
 class Incident(Base):
     __tablename__ = "incidents"
+    __table_args__ = (
+        # Dashboard: recent incidents per feed, optionally unacknowledged only;
+        # also serves plain feed_id lookups, so there is no separate feed_id index
+        Index("ix_incidents_feed_ack_ts", "feed_id", "acknowledged", "detection_timestamp"),
+        # Stats/filtering: incidents of a type within a time window
+        Index("ix_incidents_type_ts", "incident_type", "detection_timestamp"),
+        Index("idx_incidents_timestamp", "detection_timestamp"),
+        # Keyset pagination of the incident list, filtered by type or severity
+        Index("ix_incidents_type_id", "incident_type", "id"),
+        Index("ix_incidents_severity_id", "severity", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     incident_type = Column(String(50), nullable=False)  # traffic_violation, crime, civic_issue, emergency
@@ -73,12 +86,13 @@ class Incident(Base):
     # Foreign keys
     feed_id = Column(Integer, ForeignKey("cctv_feeds.id"))
     
-    # Additional metadata
-    metadata = Column(JSON)  # Store additional detection data
+    # Additional metadata ("metadata" is reserved on declarative classes,
+    # so the attribute is renamed while the column keeps its name)
+    extra_metadata = Column("metadata", JSON)  # Store additional detection data
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     feed = relationship("CCTVFeed", back_populates="incidents")
@@ -94,7 +108,7 @@ class NotificationLog(Base):
     status = Column(String(20), default="pending")  # pending, sent, failed
     sent_at = Column(DateTime)
     error_message = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
     incident = relationship("Incident")
@@ -106,7 +120,7 @@ class SystemConfig(Base):
     key = Column(String(100), unique=True, nullable=False)
     value = Column(Text)
     description = Column(Text)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     updated_by = Column(Integer, ForeignKey("users.id"))
     
     # Relationships
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
+import msgspec
 
 class IncidentType(str, Enum):
     TRAFFIC_VIOLATION = "traffic_violation"
@@ -53,12 +54,71 @@ class IncidentResponse(BaseModel):
     reported_to_authorities: bool
     reported_at: Optional[datetime]
     feed_id: int
-    metadata: Optional[dict]
+    # Read from Incident.extra_metadata when built from the ORM object
+    metadata: Optional[dict] = Field(validation_alias=AliasChoices("extra_metadata", "metadata"))
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+        frozen = True
+
+class IncidentResponseFast(msgspec.Struct, gc=False):
+    """Serialization-only twin of IncidentResponse for list endpoints"""
+    id: int
+    incident_type: str
+    sub_type: Optional[str]
+    severity: Optional[str]
+    confidence: float
+    description: Optional[str]
+    location: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    video_snapshot_path: Optional[str]
+    audio_clip_path: Optional[str]
+    thumbnail_path: Optional[str]
+    detection_timestamp: datetime
+    processing_time_ms: Optional[int]
+    acknowledged: Optional[bool]
+    acknowledged_by: Optional[int]
+    acknowledged_at: Optional[datetime]
+    reported_to_authorities: Optional[bool]
+    reported_at: Optional[datetime]
+    feed_id: Optional[int]
+    metadata: Optional[dict]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_orm(cls, incident) -> "IncidentResponseFast":
+        return cls(
+            id=incident.id,
+            incident_type=incident.incident_type,
+            sub_type=incident.sub_type,
+            severity=incident.severity,
+            confidence=incident.confidence,
+            description=incident.description,
+            location=incident.location,
+            latitude=incident.latitude,
+            longitude=incident.longitude,
+            video_snapshot_path=incident.video_snapshot_path,
+            audio_clip_path=incident.audio_clip_path,
+            thumbnail_path=incident.thumbnail_path,
+            detection_timestamp=incident.detection_timestamp,
+            processing_time_ms=incident.processing_time_ms,
+            acknowledged=incident.acknowledged,
+            acknowledged_by=incident.acknowledged_by,
+            acknowledged_at=incident.acknowledged_at,
+            reported_to_authorities=incident.reported_to_authorities,
+            reported_at=incident.reported_at,
+            feed_id=incident.feed_id,
+            metadata=incident.extra_metadata,
+            created_at=incident.created_at,
+            updated_at=incident.updated_at,
+        )
+
+# Shared encoder for msgspec structs (reused to keep its internal buffers warm)
+json_encoder = msgspec.json.Encoder()
 
 class CCTVFeedCreate(BaseModel):
     name: str
@@ -83,6 +143,37 @@ class CCTVFeedResponse(BaseModel):
 
     class Config:
         from_attributes = True
+        frozen = True
+
+class CCTVFeedResponseFast(msgspec.Struct, gc=False):
+    """Serialization-only twin of CCTVFeedResponse for list endpoints"""
+    id: int
+    name: str
+    stream_url: str
+    location: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    description: Optional[str]
+    is_active: Optional[bool]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    created_by: Optional[int]
+
+    @classmethod
+    def from_orm(cls, feed) -> "CCTVFeedResponseFast":
+        return cls(
+            id=feed.id,
+            name=feed.name,
+            stream_url=feed.stream_url,
+            location=feed.location,
+            latitude=feed.latitude,
+            longitude=feed.longitude,
+            description=feed.description,
+            is_active=feed.is_active,
+            created_at=feed.created_at,
+            updated_at=feed.updated_at,
+            created_by=feed.created_by,
+        )
 
 class UserCreate(BaseModel):
     username: str
@@ -1,18 +1,26 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, UploadFile, File, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import DefaultDict, List, Optional, Set
+import aiofiles
 import asyncio
-import json
 import logging
+from collections import defaultdict
+import orjson
+import tempfile
 from datetime import datetime
 import os
+import time
 from pathlib import Path
 
 from database.models import Incident, CCTVFeed, User
 from database.database import get_db, engine
-from database.schemas import IncidentCreate, IncidentResponse, CCTVFeedResponse
+from database.schemas import (
+    IncidentCreate, IncidentResponse, IncidentResponseFast,
+    CCTVFeedResponse, CCTVFeedResponseFast, json_encoder
+)
 from ai_models.multimodal_detector import MultimodalDetector
 from services.notification_service import NotificationService
 from services.video_processor import VideoProcessor
@@ -22,7 +30,8 @@ from auth.auth_handler import AuthHandler
 app = FastAPI(
     title="CCTV AI Monitor API",
     description="Multimodal AI system for CCTV monitoring and incident detection",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -32,47 +41,84 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize services
 auth_handler = AuthHandler()
-multimodal_detector = MultimodalDetector()
 notification_service = NotificationService()
-video_processor = VideoProcessor()
+multimodal_detector = MultimodalDetector(notification_service)
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # bytes read per step when saving uploads
+
+# Uploaded videos are analyzed in the video processor's worker processes,
+# each with its own copy of the model. Uploads beyond the worker count are
+# rejected with 429 instead of queueing.
+VIDEO_WORKERS = int(os.getenv("VIDEO_WORKERS", "1"))
+video_processor = VideoProcessor(notification_service, file_workers=VIDEO_WORKERS)
+video_slots: Optional[asyncio.Semaphore] = None
 
 # WebSocket connection manager
+BROADCAST_BATCH = 50  # Sends awaited together before yielding to the event loop
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.feed_connections: dict = {}
+        self.active_connections: Set[WebSocket] = set()
+        self.feed_connections: DefaultDict[str, Set[WebSocket]] = defaultdict(set)
 
     async def connect(self, websocket: WebSocket, feed_id: str = None):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
         if feed_id:
-            if feed_id not in self.feed_connections:
-                self.feed_connections[feed_id] = []
-            self.feed_connections[feed_id].append(websocket)
+            self.feed_connections[feed_id].add(websocket)
 
     def disconnect(self, websocket: WebSocket, feed_id: str = None):
-        self.active_connections.remove(websocket)
-        if feed_id and feed_id in self.feed_connections:
-            self.feed_connections[feed_id].remove(websocket)
+        self.active_connections.discard(websocket)
+        connections = self.feed_connections.get(feed_id)
+        if connections is not None:
+            connections.discard(websocket)
+            if not connections:
+                del self.feed_connections[feed_id]
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
 
     async def broadcast_to_feed(self, message: str, feed_id: str):
-        if feed_id in self.feed_connections:
-            for connection in self.feed_connections[feed_id]:
-                try:
-                    await connection.send_text(message)
-                except:
-                    # Remove broken connections
-                    self.feed_connections[feed_id].remove(connection)
+        # Snapshot so connects/disconnects during the sends don't affect iteration
+        connections = tuple(self.feed_connections.get(feed_id, ()))
+        dead = set()
+        
+        for start in range(0, len(connections), BROADCAST_BATCH):
+            batch = connections[start:start + BROADCAST_BATCH]
+            results = await asyncio.gather(
+                *(connection.send_text(message) for connection in batch),
+                return_exceptions=True
+            )
+            dead.update(c for c, result in zip(batch, results) if isinstance(result, Exception))
+            await asyncio.sleep(0)
+        
+        # Remove broken connections (disconnect also drops the feed once it's empty)
+        for connection in dead:
+            self.disconnect(connection, feed_id)
 
 manager = ConnectionManager()
 
+async def _ping_loop():
+    """Send one keep-alive ping per second to every connected feed"""
+    while True:
+        await asyncio.sleep(1)
+        # Encoded once per tick and shared by every connection
+        message = orjson.dumps({"type": "ping", "timestamp": time.time()}).decode()
+        for feed_id in list(manager.feed_connections):
+            await manager.broadcast_to_feed(message, feed_id)
+
+ping_task: Optional[asyncio.Task] = None
+
+# Incident stats per window size: days -> (computed_at, response)
+STATS_TTL = 30.0  # seconds
+STATS_MAX_DAYS = 365
+_stats_cache: dict = {}  # days -> (computed at, result)
+
 # Security
 security = HTTPBearer()
 
@@ -86,11 +132,17 @@ async def startup_event():
     """Initialize services on startup"""
     await multimodal_detector.initialize()
     await notification_service.initialize()
+    global ping_task, video_slots
+    ping_task = asyncio.create_task(_ping_loop())
+    video_slots = asyncio.Semaphore(VIDEO_WORKERS)
     logging.info("CCTV AI Monitor API started")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    if ping_task:
+        ping_task.cancel()
+    await video_processor.cleanup()
     await multimodal_detector.cleanup()
     await notification_service.cleanup()
     logging.info("CCTV AI Monitor API shutdown")
@@ -129,25 +181,47 @@ async def create_cctv_feed(
             created_by=current_user["user_id"]
         )
         db.add(feed)
+        db.flush()
+        # Serialize before commit expires the instance; the flush already
+        # loaded the generated id and timestamps, so no re-SELECT is needed
+        response = CCTVFeedResponse.model_validate(feed)
         db.commit()
-        db.refresh(feed)
         
         # Start processing this feed
-        asyncio.create_task(video_processor.process_feed(feed.id, feed.stream_url))
+        asyncio.create_task(video_processor.process_feed(response.id, response.stream_url))
         
-        return feed
+        return response
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/feeds/", response_model=List[CCTVFeedResponse])
 async def get_cctv_feeds(
+    cursor: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all CCTV feeds"""
-    feeds = db.query(CCTVFeed).filter(CCTVFeed.is_active == True).all()
-    return feeds
+    """Get active CCTV feeds, optionally a page at a time.
+    
+    With a limit, a full page carries an X-Next-Cursor header to pass as
+    `cursor` for the next one.
+    """
+    query = db.query(CCTVFeed).filter(CCTVFeed.is_active == True)
+    if cursor is not None:
+        query = query.filter(CCTVFeed.id > cursor)
+    query = query.order_by(CCTVFeed.id)
+    if limit is not None:
+        query = query.limit(limit)
+    feeds = query.all()
+    
+    # Same direct msgspec encoding as get_incidents
+    headers = {"X-Next-Cursor": str(feeds[-1].id)} if feeds and len(feeds) == limit else None
+    return Response(
+        json_encoder.encode([CCTVFeedResponseFast.from_orm(feed) for feed in feeds]),
+        media_type="application/json",
+        headers=headers
+    )
 
 @app.get("/api/feeds/{feed_id}", response_model=CCTVFeedResponse)
 async def get_cctv_feed(
@@ -164,23 +238,37 @@ async def get_cctv_feed(
 # Incident Management
 @app.get("/api/incidents/", response_model=List[IncidentResponse])
 async def get_incidents(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
     incident_type: Optional[str] = None,
     severity: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get incidents with filtering"""
+    """Get incidents with filtering, newest first.
+    
+    Pages by keyset: pass the X-Next-Cursor header of one response as
+    `cursor` to get the next page.
+    """
     query = db.query(Incident)
     
     if incident_type:
         query = query.filter(Incident.incident_type == incident_type)
     if severity:
         query = query.filter(Incident.severity == severity)
+    if cursor is not None:
+        query = query.filter(Incident.id < cursor)
     
-    incidents = query.offset(skip).limit(limit).all()
-    return incidents
+    incidents = query.order_by(Incident.id.desc()).limit(limit).all()
+    
+    # Encode rows directly with msgspec; returning a Response skips the
+    # per-row Pydantic validation that response_model would run
+    headers = {"X-Next-Cursor": str(incidents[-1].id)} if incidents and len(incidents) == limit else None
+    return Response(
+        json_encoder.encode([IncidentResponseFast.from_orm(incident) for incident in incidents]),
+        media_type="application/json",
+        headers=headers
+    )
 
 @app.get("/api/incidents/{incident_id}", response_model=IncidentResponse)
 async def get_incident(
@@ -217,14 +305,13 @@ async def acknowledge_incident(
 async def websocket_endpoint(websocket: WebSocket, feed_id: str):
     await manager.connect(websocket, feed_id)
     try:
+        # Keep-alive pings come from _ping_loop; just wait for the client to leave
         while True:
-            # Keep connection alive and send periodic updates
-            await asyncio.sleep(1)
-            await manager.send_personal_message(
-                json.dumps({"type": "ping", "timestamp": datetime.utcnow().isoformat()}),
-                websocket
-            )
+            await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Also on other errors (e.g. a binary frame), so dead sockets don't linger
         manager.disconnect(websocket, feed_id)
 
 # Video Processing Endpoints
@@ -235,22 +322,27 @@ async def process_video_file(
     current_user: dict = Depends(get_current_user)
 ):
     """Process uploaded video file for incidents"""
-    try:
-        # Save uploaded file temporarily
-        temp_path = f"temp_{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Process video
-        incidents = await multimodal_detector.process_video(temp_path)
-        
-        # Clean up temp file
-        os.remove(temp_path)
-        
-        return {"incidents": incidents, "processed": True}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    if video_slots.locked():
+        raise HTTPException(status_code=429, detail="Video processing is at capacity, retry later")
+    
+    async with video_slots:
+        # Stream the upload to a private temp file in 1 MiB chunks
+        fd, temp_path = tempfile.mkstemp(suffix=Path(file.filename or "").suffix)
+        os.close(fd)
+        try:
+            async with aiofiles.open(temp_path, "wb") as buffer:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    await buffer.write(chunk)
+            
+            # Process video
+            incidents = await video_processor.analyze_video_file(temp_path)
+            
+            return {"incidents": incidents, "processed": True}
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            # Clean up temp file
+            os.remove(temp_path)
 
 @app.post("/api/process/stream")
 async def process_stream(
@@ -274,14 +366,19 @@ async def process_stream(
 # Statistics and Analytics
 @app.get("/api/stats/incidents")
 async def get_incident_stats(
-    days: int = 7,
+    days: int = Query(7, ge=1, le=STATS_MAX_DAYS),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get incident statistics"""
+    """Get incident statistics, cached for STATS_TTL seconds per window"""
     from sqlalchemy import func, and_
     from datetime import timedelta
     
+    now = time.monotonic()
+    cached = _stats_cache.get(days)
+    if cached is not None and now - cached[0] < STATS_TTL:
+        return cached[1]
+    
     start_date = datetime.utcnow() - timedelta(days=days)
     
     stats = db.query(
@@ -289,10 +386,11 @@ async def get_incident_stats(
         func.count(Incident.id).label('count'),
         func.avg(Incident.confidence).label('avg_confidence')
     ).filter(
-        Incident.created_at >= start_date
+        # Range scan on idx_incidents_timestamp; results are cached above
+        Incident.detection_timestamp >= start_date
     ).group_by(Incident.incident_type).all()
     
-    return {
+    result = {
         "period_days": days,
         "incident_types": [
             {
@@ -303,6 +401,11 @@ async def get_incident_stats(
             for stat in stats
         ]
     }
+    # Drop expired windows so the cache only holds recently requested ones
+    for key in [key for key, (computed_at, _) in _stats_cache.items() if now - computed_at >= STATS_TTL]:
+        del _stats_cache[key]
+    _stats_cache[days] = (now, result)
+    return result
 
 @app.get("/api/stats/feeds")
 async def get_feed_stats(
@@ -310,8 +413,14 @@ async def get_feed_stats(
     current_user: dict = Depends(get_current_user)
 ):
     """Get feed statistics"""
-    total_feeds = db.query(CCTVFeed).count()
-    active_feeds = db.query(CCTVFeed).filter(CCTVFeed.is_active == True).count()
+    from sqlalchemy import func
+    
+    # Both counts in one round trip
+    counts = db.query(
+        func.count(CCTVFeed.id).label('total'),
+        func.count(CCTVFeed.id).filter(CCTVFeed.is_active == True).label('active')
+    ).one()
+    total_feeds, active_feeds = counts.total, counts.active
     
     return {
         "total_feeds": total_feeds,
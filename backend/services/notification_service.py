@@ -1,16 +1,123 @@
 import asyncio
 import logging
-import smtplib
-import requests
+import aiofiles
+import aiosmtplib
+import httpx
+import orjson
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
-from typing import Dict, List, Optional
+from typing import Dict, Final, List, NamedTuple, Optional, Tuple
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 import json
 import os
+import time
 from pathlib import Path
 
+from database.schemas import IncidentType
+
+EMAIL_CONFIG: Final = {
+    "smtp_server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+    "smtp_port": int(os.getenv("SMTP_PORT", "587")),
+    "username": os.getenv("SMTP_USERNAME", ""),
+    "password": os.getenv("SMTP_PASSWORD", ""),
+    "from_email": os.getenv("FROM_EMAIL", "cctv-monitor@example.com")
+}
+
+SMS_MAX_LENGTH: Final = 160
+
+# Naive datetimes are UTC throughout; detector output may carry numpy scalars
+JSON_OPTIONS: Final = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+SMS_CONFIG: Final = {
+    "api_key": os.getenv("SMS_API_KEY", ""),
+    "api_url": os.getenv("SMS_API_URL", "")
+}
+
+class AuthorityRoute(NamedTuple):
+    """Contacts notified for one incident type"""
+    emails: Tuple[str, ...]
+    webhook_url: str
+    priority: str
+
+# Authority contact mapping, resolved once at import
+AUTHORITY_ROUTES: Final[Dict[str, AuthorityRoute]] = {
+    "traffic_violation": AuthorityRoute(
+        ("traffic@city.gov", "police@city.gov"),
+        os.getenv("TRAFFIC_AUTHORITY_WEBHOOK_URL", ""),
+        "medium"
+    ),
+    "crime": AuthorityRoute(
+        ("police@city.gov", "emergency@city.gov"),
+        os.getenv("POLICE_WEBHOOK_URL", ""),
+        "high"
+    ),
+    "civic_issue": AuthorityRoute(
+        ("municipal@city.gov", "publicworks@city.gov"),
+        os.getenv("MUNICIPAL_WEBHOOK_URL", ""),
+        "low"
+    ),
+    "emergency": AuthorityRoute(
+        ("emergency@city.gov", "fire@city.gov", "police@city.gov"),
+        os.getenv("FIRE_DEPARTMENT_WEBHOOK_URL", ""),
+        "critical"
+    )
+}
+
+# Display names for incident types, computed once
+PRETTY_INCIDENT_TYPES = {t.value: t.value.replace('_', ' ').title() for t in IncidentType}
+
+NOTIFICATION_TEMPLATE = """🚨 CCTV INCIDENT ALERT 🚨
+
+Incident Type: {incident_type}
+Sub Type: {sub_type}
+Severity: {severity}
+Confidence: {confidence:.2%}
+Location: {location}
+Time: {timestamp}
+
+Description: {description}
+
+Feed ID: {feed_id}
+Incident ID: {incident_id}
+
+Please investigate this incident immediately.
+
+---
+CCTV AI Monitor System
+Generated at: {generated_at}"""
+
+@lru_cache(maxsize=1)
+def _format_utc_second(second: int) -> str:
+    """Format an epoch second; incidents in the same second reuse the string"""
+    return datetime.utcfromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+
+@lru_cache(maxsize=64)
+def _format_timestamp(timestamp: datetime) -> str:
+    """Format an incident timestamp (truncated to the second by the caller)"""
+    return timestamp.strftime("%Y-%m-%d %H:%M:%S")
+
+@lru_cache(maxsize=256)
+def pretty_name(value: str) -> str:
+    """Display name for a snake_case type/sub-type value"""
+    return PRETTY_INCIDENT_TYPES.get(value) or value.replace('_', ' ').title()
+
+def _build_mime(sender: str, recipients: List[str], subject: str, message: str,
+                img_data: Optional[bytes], filename: Optional[str]) -> MIMEMultipart:
+    """Build the alert email; runs in an executor since base64-encoding the snapshot is CPU-bound"""
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = ", ".join(recipients)
+    msg['Subject'] = subject
+    msg.attach(MIMEText(message, 'plain'))
+    if img_data is not None:
+        image = MIMEImage(img_data)
+        image.add_header('Content-Disposition', f'attachment; filename="{filename}"')
+        msg.attach(image)
+    return msg
+
 class NotificationService:
     """
     Service for sending notifications about incidents to authorities
@@ -18,62 +125,109 @@ class NotificationService:
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.config = {
-            "email": {
-                "smtp_server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
-                "smtp_port": int(os.getenv("SMTP_PORT", "587")),
-                "username": os.getenv("SMTP_USERNAME", ""),
-                "password": os.getenv("SMTP_PASSWORD", ""),
-                "from_email": os.getenv("FROM_EMAIL", "cctv-monitor@example.com")
-            },
-            "webhook": {
-                "police_url": os.getenv("POLICE_WEBHOOK_URL", ""),
-                "fire_department_url": os.getenv("FIRE_DEPARTMENT_WEBHOOK_URL", ""),
-                "traffic_authority_url": os.getenv("TRAFFIC_AUTHORITY_WEBHOOK_URL", ""),
-                "municipal_url": os.getenv("MUNICIPAL_WEBHOOK_URL", "")
-            },
-            "sms": {
-                "api_key": os.getenv("SMS_API_KEY", ""),
-                "api_url": os.getenv("SMS_API_URL", "")
-            }
-        }
         
-        # Authority contact mapping
-        self.authority_mapping = {
-            "traffic_violation": {
-                "email": ["traffic@city.gov", "police@city.gov"],
-                "webhook": "traffic_authority_url",
-                "priority": "medium"
-            },
-            "crime": {
-                "email": ["police@city.gov", "emergency@city.gov"],
-                "webhook": "police_url",
-                "priority": "high"
-            },
-            "civic_issue": {
-                "email": ["municipal@city.gov", "publicworks@city.gov"],
-                "webhook": "municipal_url",
-                "priority": "low"
-            },
-            "emergency": {
-                "email": ["emergency@city.gov", "fire@city.gov", "police@city.gov"],
-                "webhook": "fire_department_url",
-                "priority": "critical"
-            }
-        }
+        # Long-lived SMTP connection, shared by all email notifications once
+        # initialized; until then each email uses its own connection
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._smtp_lock: Optional[asyncio.Lock] = None
+        
+        # Pooled HTTP/2 client for webhook and SMS calls, between
+        # initialize() and cleanup(); otherwise each call uses its own client
+        self._http: Optional[httpx.AsyncClient] = None
+        
+        # Bounded outbound queue drained by a fixed set of workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.queue_size = 10_000
+        self.worker_count = 4
+        
+        # Non-urgent webhook payloads waiting to be sent, per URL
+        self._pending_webhooks: Dict[str, List[Dict]] = {}
+        self._webhook_flush_tasks: Dict[str, asyncio.Task] = {}
+        self.webhook_batch_window = 0.25  # seconds
+        self.webhook_batch_size = 50
+        
+        # Recently attached snapshots, keyed by path (LRU)
+        self._snapshot_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._snapshot_cache_size = 32
     
     async def initialize(self):
         """Initialize the notification service"""
+        # Created here so the lock belongs to the running event loop
+        self._smtp_lock = asyncio.Lock()
+        self._http = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=128)
+        )
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
         self.logger.info("Notification service initialized")
     
+    async def _post_json(self, url: str, payload: Dict) -> httpx.Response:
+        """POST a JSON payload, over the pooled client when there is one"""
+        content = orjson.dumps(payload, option=JSON_OPTIONS)
+        headers = {"Content-Type": "application/json"}
+        if self._http is not None:
+            return await self._http.post(url, content=content, headers=headers)
+        
+        # Not initialized, so cleanup() may never run to close a pooled client
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            return await client.post(url, content=content, headers=headers)
+    
+    @staticmethod
+    def _new_smtp() -> aiosmtplib.SMTP:
+        """Unconnected SMTP client for the configured server"""
+        return aiosmtplib.SMTP(
+            hostname=EMAIL_CONFIG["smtp_server"],
+            port=EMAIL_CONFIG["smtp_port"],
+            start_tls=True
+        )
+    
+    async def _get_smtp(self) -> aiosmtplib.SMTP:
+        """Return a connected, authenticated SMTP client, reconnecting if needed"""
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = self._new_smtp()
+            await smtp.connect()
+            try:
+                await smtp.login(EMAIL_CONFIG["username"], EMAIL_CONFIG["password"])
+            except Exception:
+                # Don't leave the socket open behind a failed login
+                smtp.close()
+                raise
+            # Cached only once it is usable
+            self._smtp = smtp
+        return self._smtp
+    
     async def send_incident_notification(self, incident: Dict):
+        """Queue notification about an incident to appropriate authorities"""
+        if self._queue is None:
+            # No workers running (service not initialized); send inline
+            await self._dispatch(incident)
+            return
+        
+        try:
+            self._queue.put_nowait(incident)
+        except asyncio.QueueFull:
+            self.logger.error(f"Notification queue full, dropping incident {incident.get('id', 'unknown')}")
+    
+    async def _worker(self):
+        """Send queued notifications one incident at a time"""
+        while True:
+            incident = await self._queue.get()
+            try:
+                await self._dispatch(incident)
+            finally:
+                self._queue.task_done()
+    
+    async def _dispatch(self, incident: Dict):
         """Send notification about an incident to appropriate authorities"""
         try:
             incident_type = incident["incident_type"]
             severity = incident.get("severity", "medium")
             
             # Get authority configuration
-            authority_config = self.authority_mapping.get(incident_type, {})
+            route = AUTHORITY_ROUTES.get(incident_type)
             
             # Create notification message
             message = await self._create_notification_message(incident)
@@ -83,15 +237,17 @@ class NotificationService:
             
             # Always send email for high/critical incidents
             if severity in ["high", "critical"]:
-                tasks.append(self._send_email_notification(incident, message))
+                tasks.append(self._send_email_notification(incident, message, route))
             
-            # Send webhook notification
-            if authority_config.get("webhook"):
-                tasks.append(self._send_webhook_notification(incident, message))
+            # Send webhook notification; urgent ones skip the batching window
+            if route is not None:
+                batch = (self._queue is not None and severity != "critical"
+                         and incident_type != "emergency")
+                tasks.append(self._send_webhook_notification(incident, message, route, batch))
             
             # Send SMS for critical incidents
             if severity == "critical":
-                tasks.append(self._send_sms_notification(incident, message))
+                tasks.append(self._send_sms_notification(incident, self._create_sms_message(incident)))
             
             # Execute all notifications concurrently
             if tasks:
@@ -111,145 +267,195 @@ class NotificationService:
             confidence = incident.get("confidence", 0.0)
             description = incident.get("description", "")
             location = incident.get("location", "Unknown location")
-            timestamp = incident.get("timestamp", datetime.utcnow())
+            timestamp = incident.get("timestamp")
             
             # Format timestamp
-            if isinstance(timestamp, datetime):
-                timestamp_str = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+            if timestamp is None:
+                timestamp_str = _format_utc_second(int(time.time()))
+            elif isinstance(timestamp, datetime):
+                timestamp_str = _format_timestamp(timestamp.replace(microsecond=0))
             else:
                 timestamp_str = str(timestamp)
             
-            message = f"""
-🚨 CCTV INCIDENT ALERT 🚨
-
-Incident Type: {incident_type.replace('_', ' ').title()}
-Sub Type: {sub_type.replace('_', ' ').title()}
-Severity: {severity.upper()}
-Confidence: {confidence:.2%}
-Location: {location}
-Time: {timestamp_str}
-
-Description: {description}
-
-Feed ID: {incident.get('feed_id', 'Unknown')}
-Incident ID: {incident.get('id', 'Unknown')}
-
-Please investigate this incident immediately.
-
----
-CCTV AI Monitor System
-Generated at: {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")}
-            """.strip()
-            
-            return message
+            return NOTIFICATION_TEMPLATE.format_map({
+                "incident_type": pretty_name(incident_type),
+                "sub_type": pretty_name(sub_type),
+                "severity": severity.upper(),
+                "confidence": confidence,
+                "location": location,
+                "timestamp": timestamp_str,
+                "description": description,
+                "feed_id": incident.get("feed_id", "Unknown"),
+                "incident_id": incident.get("id", "Unknown"),
+                "generated_at": _format_utc_second(int(time.time()))
+            })
             
         except Exception as e:
             self.logger.error(f"Error creating notification message: {e}")
             return f"Incident detected: {incident.get('incident_type', 'Unknown')}"
     
-    async def _send_email_notification(self, incident: Dict, message: str):
+    def _create_sms_message(self, incident: Dict) -> str:
+        """Create single-line SMS text, already within the 160 character limit"""
+        return (
+            f"[{incident.get('severity', 'medium')[:1].upper()}] "
+            f"{pretty_name(incident['incident_type'])} @ {(incident.get('location') or '?')[:40]} "
+            f"conf={incident.get('confidence', 0.0):.0%} id={incident.get('id', '?')}"
+        )[:SMS_MAX_LENGTH]
+    
+    async def _send_email_notification(self, incident: Dict, message: str,
+                                       route: Optional[AuthorityRoute]):
         """Send email notification"""
         try:
             incident_type = incident["incident_type"]
-            authority_config = self.authority_mapping.get(incident_type, {})
-            recipients = authority_config.get("email", [])
+            recipients = list(route.emails) if route is not None else []
             
             if not recipients:
                 self.logger.warning(f"No email recipients configured for {incident_type}")
                 return
             
-            # Create email
-            msg = MIMEMultipart()
-            msg['From'] = self.config["email"]["from_email"]
-            msg['To'] = ", ".join(recipients)
-            msg['Subject'] = f"CCTV Alert: {incident_type.replace('_', ' ').title()} - {incident.get('severity', 'medium').upper()}"
-            
-            # Add message body
-            msg.attach(MIMEText(message, 'plain'))
+            subject = f"CCTV Alert: {pretty_name(incident_type)} - {incident.get('severity', 'medium').upper()}"
             
             # Add image attachment if available
             snapshot_path = incident.get("video_snapshot_path")
-            if snapshot_path and os.path.exists(snapshot_path):
-                with open(snapshot_path, 'rb') as f:
-                    img_data = f.read()
-                    image = MIMEImage(img_data)
-                    image.add_header('Content-Disposition', f'attachment; filename="{os.path.basename(snapshot_path)}"')
-                    msg.attach(image)
-            
-            # Send email
-            server = smtplib.SMTP(self.config["email"]["smtp_server"], self.config["email"]["smtp_port"])
-            server.starttls()
-            server.login(self.config["email"]["username"], self.config["email"]["password"])
-            
-            text = msg.as_string()
-            server.sendmail(self.config["email"]["from_email"], recipients, text)
-            server.quit()
+            img_data = await self._load_snapshot(snapshot_path) if snapshot_path else None
+            filename = os.path.basename(snapshot_path) if img_data is not None else None
+            
+            # Create email off the event loop
+            msg = await asyncio.get_running_loop().run_in_executor(
+                None, _build_mime, EMAIL_CONFIG["from_email"], recipients,
+                subject, message, img_data, filename
+            )
+            
+            if self._smtp_lock is None:
+                # Not initialized, so cleanup() may never run to close a
+                # shared connection; use one that closes after this email
+                async with self._new_smtp() as smtp:
+                    await smtp.login(EMAIL_CONFIG["username"], EMAIL_CONFIG["password"])
+                    await smtp.send_message(msg, sender=EMAIL_CONFIG["from_email"], recipients=recipients)
+                self.logger.info(f"Email notification sent to {recipients}")
+                return
+            
+            # Send email over the shared connection
+            async with self._smtp_lock:
+                try:
+                    smtp = await self._get_smtp()
+                    await smtp.send_message(msg, sender=EMAIL_CONFIG["from_email"], recipients=recipients)
+                except aiosmtplib.SMTPServerDisconnected:
+                    # Server dropped the idle connection; reconnect once and retry
+                    self._smtp = None
+                    smtp = await self._get_smtp()
+                    await smtp.send_message(msg, sender=EMAIL_CONFIG["from_email"], recipients=recipients)
             
             self.logger.info(f"Email notification sent to {recipients}")
             
         except Exception as e:
             self.logger.error(f"Error sending email notification: {e}")
     
-    async def _send_webhook_notification(self, incident: Dict, message: str):
-        """Send webhook notification"""
+    async def _load_snapshot(self, snapshot_path: str) -> Optional[bytes]:
+        """Read a snapshot file without blocking, serving repeats from the LRU cache"""
+        img_data = self._snapshot_cache.get(snapshot_path)
+        if img_data is not None:
+            self._snapshot_cache.move_to_end(snapshot_path)
+            return img_data
+        
+        try:
+            async with aiofiles.open(snapshot_path, 'rb') as f:
+                img_data = await f.read()
+        except FileNotFoundError:
+            return None
+        
+        self._snapshot_cache[snapshot_path] = img_data
+        if len(self._snapshot_cache) > self._snapshot_cache_size:
+            self._snapshot_cache.popitem(last=False)
+        return img_data
+    
+    async def _send_webhook_notification(self, incident: Dict, message: str,
+                                         route: Optional[AuthorityRoute], batch: bool = False):
+        """Send webhook notification, or queue it for the URL's next batch"""
         try:
             incident_type = incident["incident_type"]
-            authority_config = self.authority_mapping.get(incident_type, {})
-            webhook_key = authority_config.get("webhook")
-            
-            if not webhook_key:
+            if route is None:
                 self.logger.warning(f"No webhook configured for {incident_type}")
                 return
             
-            webhook_url = self.config["webhook"].get(webhook_key)
+            webhook_url = route.webhook_url
             if not webhook_url:
-                self.logger.warning(f"Webhook URL not configured for {webhook_key}")
+                self.logger.warning(f"Webhook URL not configured for {incident_type}")
                 return
             
             # Prepare webhook payload
-            payload = {
-                "incident": {
-                    "id": incident.get("id"),
-                    "type": incident_type,
-                    "sub_type": incident.get("sub_type"),
-                    "severity": incident.get("severity"),
-                    "confidence": incident.get("confidence"),
-                    "description": incident.get("description"),
-                    "location": incident.get("location"),
-                    "latitude": incident.get("latitude"),
-                    "longitude": incident.get("longitude"),
-                    "timestamp": incident.get("timestamp"),
-                    "feed_id": incident.get("feed_id"),
-                    "message": message
-                },
-                "metadata": {
-                    "source": "cctv-ai-monitor",
-                    "version": "1.0.0",
-                    "sent_at": datetime.utcnow().isoformat()
-                }
+            entry = {
+                "id": incident.get("id"),
+                "type": incident_type,
+                "sub_type": incident.get("sub_type"),
+                "severity": incident.get("severity"),
+                "confidence": incident.get("confidence"),
+                "description": incident.get("description"),
+                "location": incident.get("location"),
+                "latitude": incident.get("latitude"),
+                "longitude": incident.get("longitude"),
+                "timestamp": incident.get("timestamp"),
+                "feed_id": incident.get("feed_id"),
+                "message": message
             }
             
-            # Send webhook
-            response = requests.post(
-                webhook_url,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30
-            )
+            if batch:
+                pending = self._pending_webhooks.setdefault(webhook_url, [])
+                pending.append(entry)
+                if len(pending) >= self.webhook_batch_size:
+                    flush_task = self._webhook_flush_tasks.pop(webhook_url, None)
+                    if flush_task is not None:
+                        flush_task.cancel()
+                    await self._flush_webhooks(webhook_url)
+                elif webhook_url not in self._webhook_flush_tasks:
+                    self._webhook_flush_tasks[webhook_url] = asyncio.create_task(
+                        self._flush_webhooks_after(webhook_url)
+                    )
+                return
             
-            if response.status_code == 200:
-                self.logger.info(f"Webhook notification sent to {webhook_url}")
-            else:
-                self.logger.error(f"Webhook notification failed: {response.status_code} - {response.text}")
+            await self._post_webhook(webhook_url, {"incident": entry, "metadata": self._webhook_metadata()})
             
         except Exception as e:
             self.logger.error(f"Error sending webhook notification: {e}")
     
+    @staticmethod
+    def _webhook_metadata() -> Dict:
+        """Envelope metadata sent with every webhook request"""
+        return {
+            "source": "cctv-ai-monitor",
+            "version": "1.0.0",
+            "sent_at": time.time()
+        }
+    
+    async def _flush_webhooks_after(self, webhook_url: str):
+        """Send the pending batch for a URL once the batching window closes"""
+        await asyncio.sleep(self.webhook_batch_window)
+        self._webhook_flush_tasks.pop(webhook_url, None)
+        await self._flush_webhooks(webhook_url)
+    
+    async def _flush_webhooks(self, webhook_url: str):
+        """POST all pending incidents for a URL in one request"""
+        batch = self._pending_webhooks.pop(webhook_url, None)
+        if not batch:
+            return
+        try:
+            await self._post_webhook(webhook_url, {"incidents": batch, "metadata": self._webhook_metadata()})
+        except Exception as e:
+            self.logger.error(f"Error sending webhook batch of {len(batch)} incidents: {e}")
+    
+    async def _post_webhook(self, webhook_url: str, payload: Dict):
+        """POST a JSON payload to a webhook URL and log the outcome"""
+        response = await self._post_json(webhook_url, payload)
+        
+        if response.status_code == 200:
+            self.logger.info(f"Webhook notification sent to {webhook_url}")
+        else:
+            self.logger.error(f"Webhook notification failed: {response.status_code} - {response.text}")
+    
     async def _send_sms_notification(self, incident: Dict, message: str):
         """Send SMS notification"""
         try:
-            sms_config = self.config["sms"]
-            if not sms_config["api_key"] or not sms_config["api_url"]:
+            if not SMS_CONFIG["api_key"] or not SMS_CONFIG["api_url"]:
                 self.logger.warning("SMS configuration not available")
                 return
             
@@ -263,19 +469,14 @@ Generated at: {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")}
             
             # Prepare SMS payload
             sms_payload = {
-                "api_key": sms_config["api_key"],
+                "api_key": SMS_CONFIG["api_key"],
                 "to": emergency_contacts,
-                "message": message[:160],  # SMS character limit
+                "message": message,
                 "priority": "high"
             }
             
             # Send SMS
-            response = requests.post(
-                sms_config["api_url"],
-                json=sms_payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30
-            )
+            response = await self._post_json(SMS_CONFIG["api_url"], sms_payload)
             
             if response.status_code == 200:
                 self.logger.info(f"SMS notification sent to {emergency_contacts}")
@@ -301,13 +502,14 @@ Generated at: {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")}
             }
             
             message = await self._create_notification_message(test_incident)
+            route = AUTHORITY_ROUTES[test_incident["incident_type"]]
             
             if notification_type == "email":
-                await self._send_email_notification(test_incident, message)
+                await self._send_email_notification(test_incident, message, route)
             elif notification_type == "webhook":
-                await self._send_webhook_notification(test_incident, message)
+                await self._send_webhook_notification(test_incident, message, route)
             elif notification_type == "sms":
-                await self._send_sms_notification(test_incident, message)
+                await self._send_sms_notification(test_incident, self._create_sms_message(test_incident))
             
             self.logger.info(f"Test {notification_type} notification sent successfully")
             
@@ -318,15 +520,38 @@ Generated at: {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")}
         """Check if notification service is healthy"""
         try:
             # Check if required configuration is available
-            email_config = self.config["email"]
             return (
-                bool(email_config["username"]) and
-                bool(email_config["password"]) and
-                bool(email_config["from_email"])
+                bool(EMAIL_CONFIG["username"]) and
+                bool(EMAIL_CONFIG["password"]) and
+                bool(EMAIL_CONFIG["from_email"])
             )
         except:
             return False
     
     async def cleanup(self):
         """Cleanup notification service"""
+        if self._queue is not None:
+            # Let queued notifications go out before closing connections
+            await self._queue.join()
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+            self._queue = None
+        for flush_task in self._webhook_flush_tasks.values():
+            flush_task.cancel()
+        self._webhook_flush_tasks.clear()
+        for webhook_url in list(self._pending_webhooks):
+            await self._flush_webhooks(webhook_url)
+        if self._smtp is not None and self._smtp.is_connected:
+            try:
+                await self._smtp.quit()
+            except aiosmtplib.SMTPException as e:
+                self.logger.warning(f"Error closing SMTP connection: {e}")
+        self._smtp = None
+        self._smtp_lock = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._snapshot_cache.clear()
         self.logger.info("Notification service cleaned up")
@@ -2,33 +2,282 @@ import cv2
 import asyncio
 import logging
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime
+from operator import attrgetter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import io
+import multiprocessing
 import os
+import shutil
+import subprocess
+import tempfile
+import time
 import json
-from ai_models.multimodal_detector import MultimodalDetector
-from database.database import get_db
+from ai_models.multimodal_detector import MultimodalDetector, open_video_capture
+from database.database import SessionLocal
 from database.models import Incident, CCTVFeed
+from services.notification_service import NotificationService
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+@dataclass
+class IncidentRecord:
+    """An incident waiting in the write buffer, laid out as an incidents row"""
+    # Declared by hand (dataclass(slots=True) needs Python 3.10); field
+    # names match the table's column names
+    __slots__ = (
+        "incident_type", "sub_type", "severity", "confidence", "description",
+        "location", "latitude", "longitude", "video_snapshot_path",
+        "audio_clip_path", "thumbnail_path", "detection_timestamp",
+        "processing_time_ms", "feed_id", "metadata"
+    )
+    incident_type: str
+    sub_type: str
+    severity: str
+    confidence: float
+    description: str
+    location: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    video_snapshot_path: Optional[str]
+    audio_clip_path: Optional[str]
+    thumbnail_path: Optional[str]
+    detection_timestamp: datetime
+    processing_time_ms: Optional[int]
+    feed_id: int
+    metadata: Any
+    
+    def as_row(self) -> Dict:
+        """Column -> value mapping for an executemany INSERT"""
+        return dict(zip(self.__slots__, _record_values(self)))
+
+# All fields of a record as a tuple, in column order
+_record_values = attrgetter(*IncidentRecord.__slots__)
+
+# Built once; executemany of record rows, with generated ids returned in row order
+INCIDENT_INSERT = Incident.__table__.insert().returning(
+    Incident.__table__.c.id, sort_by_parameter_order=True
+)
+
+# Columns with Python-side defaults, which COPY would otherwise leave NULL
+COPY_DEFAULTS = {"acknowledged": False, "reported_to_authorities": False}
+
+def _copy_field(value) -> str:
+    """Render one value in PostgreSQL COPY text format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+def _probe_frame_size(file_path: str) -> Tuple[int, int]:
+    """(width, height) of a file's first video stream, as FFmpeg decodes it"""
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "stream=width,height", "-of", "csv=p=0:s=x", file_path
+        ],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on {file_path}: {result.stderr.strip()}")
+    try:
+        width, height = (int(value) for value in result.stdout.strip().split("x")[:2])
+    except ValueError:
+        raise ValueError(f"Could not read frame size of {file_path}") from None
+    return width, height
+
+def _ffmpeg_frames(file_path: str, stride: int = 30) -> Iterator[Tuple[int, np.ndarray]]:
+    """Decode every stride-th frame of a file with an FFmpeg subprocess.
+    
+    FFmpeg's select filter drops the other frames before pixel conversion,
+    and frames arrive as raw BGR (what the detector expects) over a pipe.
+    Raises RuntimeError if FFmpeg fails, rather than ending early.
+    """
+    width, height = _probe_frame_size(file_path)
+    
+    # Errors go to a file: a stderr pipe nobody reads could fill and stall FFmpeg
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(
+            [
+                # No rotation, and -s pins the output to the probed size, so
+                # the byte count per frame always matches the buffer below
+                "ffmpeg", "-loglevel", "error", "-noautorotate", "-i", file_path,
+                "-vf", f"select=not(mod(n\\,{stride}))", "-vsync", "0",
+                "-s", f"{width}x{height}", "-f", "rawvideo", "-pix_fmt", "bgr24", "-"
+            ],
+            stdout=subprocess.PIPE,
+            stderr=stderr
+        )
+        frame_size = width * height * 3
+        try:
+            index = 0
+            while True:
+                # A fresh writable buffer per frame; the batch holds on to earlier ones
+                data = bytearray(frame_size)
+                read = proc.stdout.readinto(data)
+                if read < frame_size:
+                    break
+                yield index * stride, np.frombuffer(data, np.uint8).reshape(height, width, 3)
+                index += 1
+            
+            returncode = proc.wait()
+            if returncode != 0 or read:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                raise RuntimeError(
+                    f"ffmpeg failed on {file_path} after {index} frames "
+                    f"(exit {returncode}): {message or 'truncated frame'}"
+                )
+        finally:
+            proc.stdout.close()
+            # Only still running if the consumer stopped early
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+# Detector loaded once per pool process, on its first job
+_worker_detector: Optional[MultimodalDetector] = None
+
+def _worker_process_video(file_path: str) -> List[Dict]:
+    """Analyze a video file inside a pool process"""
+    global _worker_detector
+    if _worker_detector is None:
+        _worker_detector = MultimodalDetector()
+        asyncio.run(_worker_detector.initialize())
+    
+    if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+        return asyncio.run(_worker_detector.process_video(file_path))
+    return asyncio.run(_worker_detector.process_frames(_ffmpeg_frames(file_path)))
+
+@lru_cache(maxsize=1)
+def _iso_utc_second(second: int) -> str:
+    """ISO timestamp of an epoch second; polls within the same second reuse it"""
+    return datetime.utcfromtimestamp(second).isoformat()
+
+# Reported frame rates outside this range are replaced by the default
+MIN_SOURCE_FPS = 1.0
+MAX_SOURCE_FPS = 120.0
+DEFAULT_SOURCE_FPS = 30.0
+
+def put_latest(q: asyncio.Queue, item):
+    """Put item, evicting the oldest entry if the queue is full; returns the evicted entry"""
+    evicted = q.get_nowait() if q.full() else None
+    q.put_nowait(item)
+    return evicted
+
+class _StreamReader:
+    """Blocking OpenCV side of one stream, only ever used from its reader thread"""
+    
+    def __init__(self, stream_url: str, max_width: int):
+        # Opening a network source can block for seconds; decodes on the
+        # GPU when FFmpeg has a hardware decoder for the stream
+        self.cap = open_video_capture(stream_url)
+        if self.cap.isOpened():
+            # Keep at most one frame queued in the driver so analysis sees live frames
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        # Live sources are rate-limited by grab() itself; files are not
+        self.is_file = os.path.isfile(stream_url)
+        # Some RTSP/H.264 sources report their timebase (e.g. 90000) as the
+        # frame rate; treat anything implausible as unknown
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if MIN_SOURCE_FPS <= fps <= MAX_SOURCE_FPS else DEFAULT_SOURCE_FPS
+        self.max_width = max_width
+        self._size: Optional[tuple] = None  # (w, h) to downscale to, once known
+        self._full: Optional[np.ndarray] = None  # reused full-resolution decode target
+    
+    def read(self, decode: bool, dst: Optional[np.ndarray] = None):
+        """Advance one frame and decode it only if asked, in a single thread hop.
+        
+        Frames wider than max_width are downscaled (INTER_AREA) here, so
+        inference never handles more pixels than it can use. A dst of the
+        right shape is written into in place; otherwise a new array is made.
+        """
+        if not self.cap.grab():
+            return False, None
+        if not decode:
+            return True, None
+        
+        if self._size is not None:
+            ret, self._full = self.cap.retrieve(self._full)
+            if not ret:
+                return False, None
+            return True, cv2.resize(self._full, self._size, dst=dst, interpolation=cv2.INTER_AREA)
+        
+        ret, frame = self.cap.retrieve(dst)
+        if ret and frame.shape[1] > self.max_width:
+            # First oversized frame: decode at full size into a scratch buffer from now on
+            height, width = frame.shape[:2]
+            self._size = (self.max_width, round(height * self.max_width / width))
+            self._full = frame
+            return True, cv2.resize(frame, self._size, interpolation=cv2.INTER_AREA)
+        return ret, frame
+    
+    def release(self):
+        """Close the underlying capture"""
+        self.cap.release()
+
 class VideoProcessor:
     """
     Service for processing video streams and files
     """
     
-    def __init__(self):
+    def __init__(self, notifier: Optional[NotificationService] = None, file_workers: int = 2):
         self.logger = logging.getLogger(__name__)
-        self.detector = MultimodalDetector()
+        # Reused for every incident; pass the app's service to share its
+        # connection pools and dispatch queue
+        self._owns_notifier = notifier is None
+        self.notifier = notifier or NotificationService()
+        self.detector = MultimodalDetector(self.notifier)
         self.active_streams: Dict[int, asyncio.Task] = {}
+        self._active_feeds: List[int] = []  # rebuilt only when a stream starts or stops
         self.processing_stats = {
             "frames_processed": 0,
             "incidents_detected": 0,
+            "dropped_frames": 0,
             "active_streams": 0
         }
+        # Each capture stage counts frames locally and adds them to
+        # processing_stats in batches of this size
+        self.stats_batch_frames = 100
+        
+        # Incidents waiting to be written in one batched INSERT
+        # (or COPY, for large batches on PostgreSQL)
+        self._incident_buffer: List[IncidentRecord] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # Batch writes in progress; they outlive a cancelled caller
+        self._flush_writes: Set[asyncio.Task] = set()
+        self.flush_interval = 0.25  # seconds
+        self.flush_size = 100
+        self.copy_threshold = 100
+        
+        # Wider frames are downscaled before analysis
+        self.analysis_max_width = 1280
+        
+        # Frames from all feeds are analyzed together in small batches
+        self._batch_q: Optional[asyncio.Queue] = None
+        self._batcher_task: Optional[asyncio.Task] = None
+        self.max_batch = 8
+        self.batch_wait = 0.02  # seconds to wait for other feeds' frames
+        
+        # Video files are analyzed in separate processes so they can't starve live feeds
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.file_workers = file_workers
     
     async def initialize(self):
         """Initialize the video processor"""
         await self.detector.initialize()
+        if self._owns_notifier:
+            await self.notifier.initialize()
         self.logger.info("Video processor initialized")
     
     async def process_feed(self, feed_id: int, stream_url: str):
@@ -43,7 +292,7 @@ class VideoProcessor:
                 self._process_stream(feed_id, stream_url)
             )
             self.active_streams[feed_id] = task
-            self.processing_stats["active_streams"] = len(self.active_streams)
+            self._streams_changed()
             
             self.logger.info(f"Started processing feed {feed_id}")
             
@@ -57,73 +306,158 @@ class VideoProcessor:
                 task = self.active_streams[feed_id]
                 task.cancel()
                 del self.active_streams[feed_id]
-                self.processing_stats["active_streams"] = len(self.active_streams)
+                self._streams_changed()
                 self.logger.info(f"Stopped processing feed {feed_id}")
         except Exception as e:
             self.logger.error(f"Error stopping feed processing: {e}")
     
+    def _streams_changed(self):
+        """Refresh the stream count and feed list reported by get_processing_stats"""
+        self.processing_stats["active_streams"] = len(self.active_streams)
+        self._active_feeds = list(self.active_streams)
+    
     async def _process_stream(self, feed_id: int, stream_url: str):
-        """Process a video stream"""
-        cap = None
-        frame_count = 0
-        last_incident_time = datetime.utcnow()
+        """Process a video stream
+        
+        Capture, inference and persistence run as separate stages joined by
+        bounded queues, so the next frame is captured while the current one
+        is analyzed and earlier incidents are saved.
+        """
+        stream = None
+        # OpenCV calls block, so they run on a dedicated thread; a single
+        # worker also keeps release() from racing an in-flight grab()
+        reader = ThreadPoolExecutor(max_workers=1)
+        # Holds only the newest frame, so analysis never works on a backlog
+        frame_q: asyncio.Queue = asyncio.Queue(maxsize=1)
+        # Frame buffers not currently queued or being analyzed; the pool
+        # settles at one per frame in flight, after which decoding reuses them
+        free_frames: List[np.ndarray] = []
+        incident_q: asyncio.Queue = asyncio.Queue(maxsize=32)
+        stages = []
         
         try:
             # Open video stream
-            cap = cv2.VideoCapture(stream_url)
+            stream = await asyncio.get_running_loop().run_in_executor(
+                reader, _StreamReader, stream_url, self.analysis_max_width
+            )
             
-            if not cap.isOpened():
+            if not stream.cap.isOpened():
                 self.logger.error(f"Failed to open stream: {stream_url}")
                 return
             
             self.logger.info(f"Processing stream for feed {feed_id}")
             
+            stages = [
+                asyncio.create_task(self._capture(stream, reader, feed_id, frame_q, free_frames)),
+                asyncio.create_task(self._infer(feed_id, frame_q, incident_q, free_frames)),
+                asyncio.create_task(self._persist(feed_id, incident_q))
+            ]
+            await asyncio.gather(*stages)
+                
+        except asyncio.CancelledError:
+            self.logger.info(f"Stream processing cancelled for feed {feed_id}")
+        except Exception as e:
+            self.logger.error(f"Error processing stream: {e}")
+        finally:
+            for stage in stages:
+                stage.cancel()
+            if stream:
+                reader.submit(stream.release)
+            reader.shutdown(wait=False)
+            if feed_id in self.active_streams:
+                del self.active_streams[feed_id]
+                self._streams_changed()
+    
+    async def _capture(self, stream: _StreamReader, reader: ThreadPoolExecutor,
+                       feed_id: int, frame_q: asyncio.Queue, free_frames: List[np.ndarray]):
+        """Capture stage: grab frames and queue one per second of video for analysis"""
+        loop = asyncio.get_running_loop()
+        frame_count = 0
+        start = time.monotonic()
+        # Frames per analyzed frame, from the source's own rate (30 if unknown)
+        stride = min(max(1, round(stream.fps)), round(MAX_SOURCE_FPS))
+        countdown = stride
+        # Frames counted since the last fold into the shared stats
+        unreported = 0
+        
+        try:
             while True:
-                ret, frame = cap.read()
+                # The frames in between are only demuxed by grab() and never decoded
+                decode = countdown == 1
+                dst = free_frames.pop() if decode and free_frames else None
+                ret, frame = await loop.run_in_executor(reader, stream.read, decode, dst)
                 if not ret:
+                    if dst is not None:
+                        free_frames.append(dst)
                     self.logger.warning(f"Failed to read frame from feed {feed_id}")
                     await asyncio.sleep(1)
                     continue
                 
                 frame_count += 1
-                self.processing_stats["frames_processed"] += 1
+                unreported += 1
+                if unreported >= self.stats_batch_frames:
+                    self.processing_stats["frames_processed"] += unreported
+                    unreported = 0
+                countdown = stride if decode else countdown - 1
                 
-                # Process every 30th frame (1 second at 30fps)
-                if frame_count % 30 == 0:
-                    try:
-                        incidents = await self._analyze_frame(frame, feed_id, frame_count)
-                        
-                        if incidents:
-                            for incident in incidents:
-                                await self._save_incident(incident, feed_id)
-                                self.processing_stats["incidents_detected"] += 1
-                                last_incident_time = datetime.utcnow()
-                        
-                    except Exception as e:
-                        self.logger.error(f"Error analyzing frame: {e}")
+                if decode:
+                    # Replace a frame inference hasn't picked up yet rather than fall behind
+                    evicted = put_latest(frame_q, (frame_count, frame))
+                    if evicted is not None:
+                        free_frames.append(evicted[1])
+                        self.processing_stats["dropped_frames"] += 1
                 
-                # Check for stream health
-                if (datetime.utcnow() - last_incident_time).seconds > 300:  # 5 minutes
-                    self.logger.warning(f"No activity detected in feed {feed_id} for 5 minutes")
+                # grab() blocks until a live source has the next frame; a local
+                # file would be read as fast as it demuxes, so pace it to its fps
+                if stream.is_file:
+                    delay = start + frame_count / stream.fps - time.monotonic()
+                    if delay > 1e-3:
+                        await asyncio.sleep(delay)
+        finally:
+            self.processing_stats["frames_processed"] += unreported
+    
+    async def _infer(self, feed_id: int, frame_q: asyncio.Queue, incident_q: asyncio.Queue,
+                     free_frames: List[np.ndarray]):
+        """Inference stage: analyze queued frames and pass incidents on"""
+        last_activity = time.monotonic()
+        
+        while True:
+            frame_count, frame = await frame_q.get()
+            try:
+                incidents = await self._analyze_frame(frame, feed_id, frame_count)
                 
-                await asyncio.sleep(0.033)  # ~30fps
+                for incident in incidents:
+                    await incident_q.put(incident)
+                    last_activity = time.monotonic()
                 
-        except asyncio.CancelledError:
-            self.logger.info(f"Stream processing cancelled for feed {feed_id}")
-        except Exception as e:
-            self.logger.error(f"Error processing stream: {e}")
-        finally:
-            if cap:
-                cap.release()
-            if feed_id in self.active_streams:
-                del self.active_streams[feed_id]
-                self.processing_stats["active_streams"] = len(self.active_streams)
+            except Exception as e:
+                self.logger.error(f"Error analyzing frame: {e}")
+            finally:
+                # Analysis keeps no reference to the pixels, so the buffer can be reused
+                free_frames.append(frame)
+            
+            # Check for stream health
+            if time.monotonic() - last_activity > 300:  # 5 minutes
+                self.logger.warning(f"No activity detected in feed {feed_id} for 5 minutes")
+                last_activity = time.monotonic()
+    
+    async def _persist(self, feed_id: int, incident_q: asyncio.Queue):
+        """Persistence stage: hand incidents to the batched writer"""
+        while True:
+            incident = await incident_q.get()
+            await self._save_incident(incident, feed_id)
+            self.processing_stats["incidents_detected"] += 1
     
     async def _analyze_frame(self, frame: np.ndarray, feed_id: int, frame_count: int) -> List[Dict]:
         """Analyze a frame for incidents"""
         try:
-            # Use the multimodal detector to analyze the frame
-            incident = await self.detector._analyze_frame(frame, frame_count, feed_id)
+            # Hand the frame to the shared batcher and wait for its result
+            if self._batch_q is None:
+                self._batch_q = asyncio.Queue()
+                self._batcher_task = asyncio.create_task(self._batcher())
+            result = asyncio.get_running_loop().create_future()
+            await self._batch_q.put((frame, frame_count, feed_id, result))
+            incident = await result
             
             if incident:
                 return [incident]
@@ -133,75 +467,192 @@ class VideoProcessor:
             self.logger.error(f"Error analyzing frame: {e}")
             return []
     
-    async def _save_incident(self, incident: Dict, feed_id: int):
-        """Save incident to database"""
-        try:
-            # Get database session
-            db = next(get_db())
+    async def _batcher(self):
+        """Collect frames queued by all feeds and run them through the detector together"""
+        while True:
+            batch = [await self._batch_q.get()]
             
-            # Create incident record
-            incident_record = Incident(
-                incident_type=incident["incident_type"],
-                sub_type=incident["sub_type"],
-                severity=incident["severity"],
-                confidence=incident["confidence"],
-                description=incident.get("description", ""),
-                location=incident.get("location", ""),
-                latitude=incident.get("latitude"),
-                longitude=incident.get("longitude"),
-                video_snapshot_path=incident.get("video_snapshot_path"),
-                audio_clip_path=incident.get("audio_clip_path"),
-                thumbnail_path=incident.get("thumbnail_path"),
-                detection_timestamp=incident["timestamp"],
-                processing_time_ms=incident.get("processing_time_ms"),
-                feed_id=feed_id,
-                metadata=incident.get("metadata", {})
-            )
+            # With several feeds live, give the others a moment to contribute
+            if len(self.active_streams) > 1 and len(batch) < self.max_batch:
+                await asyncio.sleep(self.batch_wait)
+            while len(batch) < self.max_batch and not self._batch_q.empty():
+                batch.append(self._batch_q.get_nowait())
             
-            db.add(incident_record)
-            db.commit()
-            db.refresh(incident_record)
+            frames, timestamps, feed_ids, results = zip(*batch)
+            try:
+                detections = await self.detector.analyze_batch(
+                    list(frames), list(timestamps), list(feed_ids)
+                )
+            except Exception as e:
+                for result in results:
+                    if not result.done():
+                        result.set_exception(e)
+                continue
             
-            self.logger.info(f"Saved incident {incident_record.id} for feed {feed_id}")
+            for result, detection in zip(results, detections):
+                if not result.done():
+                    result.set_result(detection)
+    
+    async def _save_incident(self, incident: Dict, feed_id: int):
+        """Queue incident for the next batched database write"""
+        self._incident_buffer.append(self._incident_row(incident, feed_id))
+        
+        if len(self._incident_buffer) >= self.flush_size:
+            await self._flush_incidents()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_after(self.flush_interval))
+    
+    async def _save_incidents(self, incidents: List[Dict], feed_id: int):
+        """Write a whole result set (e.g. from a video file) as one batch"""
+        self._incident_buffer.extend(self._incident_row(incident, feed_id) for incident in incidents)
+        await self._flush_incidents()
+    
+    @staticmethod
+    def _incident_row(incident: Dict, feed_id: int) -> IncidentRecord:
+        """Map a detector incident onto incidents table columns"""
+        return IncidentRecord(
+            incident_type=incident["incident_type"],
+            sub_type=incident["sub_type"],
+            severity=incident["severity"],
+            confidence=incident["confidence"],
+            description=incident.get("description", ""),
+            location=incident.get("location", ""),
+            latitude=incident.get("latitude"),
+            longitude=incident.get("longitude"),
+            video_snapshot_path=incident.get("video_snapshot_path"),
+            audio_clip_path=incident.get("audio_clip_path"),
+            thumbnail_path=incident.get("thumbnail_path"),
+            detection_timestamp=incident["timestamp"],
+            processing_time_ms=incident.get("processing_time_ms"),
+            feed_id=feed_id,
+            metadata=incident.get("metadata", {})
+        )
+    
+    async def _flush_after(self, delay: float):
+        """Flush buffered incidents after a short delay"""
+        await asyncio.sleep(delay)
+        await self._flush_incidents()
+    
+    async def _flush_incidents(self):
+        """Write buffered incidents to the database in a single transaction"""
+        if not self._incident_buffer:
+            return
+        
+        # Created lazily so the lock belongs to the running event loop
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        
+        # Once rows are taken from the buffer they must be committed and then
+        # notified; shielding keeps a cancelled caller (a stopped stream's
+        # persist stage, the flush timer) from stopping the write in between
+        write = asyncio.create_task(self._write_locked())
+        self._flush_writes.add(write)
+        write.add_done_callback(self._flush_writes.discard)
+        await asyncio.shield(write)
+    
+    async def _write_locked(self):
+        """Write one batch at a time, so incidents are committed (and notified) in order"""
+        async with self._flush_lock:
+            await self._write_batch()
+    
+    async def _write_batch(self):
+        """Insert everything currently buffered and notify for each saved incident"""
+        if not self._incident_buffer:
+            return
+        
+        records, self._incident_buffer = self._incident_buffer, []
+        
+        # The driver calls block, so the write runs on a worker thread
+        incident_ids = await asyncio.to_thread(self._insert_rows, records)
+        if incident_ids is None:
+            return
+        
+        for incident_id, record in zip(incident_ids, records):
+            self.logger.info(f"Saved incident {incident_id} for feed {record.feed_id}")
             
             # Send notification
-            await self._send_notification(incident_record)
-            
+            await self._send_notification(incident_id, record)
+    
+    def _insert_rows(self, records: List[IncidentRecord]) -> Optional[List[int]]:
+        """Insert rows in one transaction; returns their ids, or None on failure"""
+        db = SessionLocal()
+        try:
+            if len(records) >= self.copy_threshold and db.get_bind().dialect.name == "postgresql":
+                incident_ids = self._copy_incidents(db, records)
+            else:
+                # Core executemany, bypassing the ORM unit of work
+                result = db.execute(INCIDENT_INSERT, [record.as_row() for record in records])
+                incident_ids = result.scalars().all()
+            db.commit()
         except Exception as e:
-            self.logger.error(f"Error saving incident: {e}")
+            db.rollback()
+            self.logger.error(f"Error saving {len(records)} incidents: {e}")
+            return None
         finally:
             db.close()
+        return incident_ids
+    
+    def _copy_incidents(self, db: Session, records: List[IncidentRecord]) -> List[int]:
+        """Bulk-load records with COPY FROM STDIN, returning their ids in order"""
+        # COPY cannot return generated keys, so reserve the ids up front
+        incident_ids = db.execute(
+            text("SELECT nextval(pg_get_serial_sequence('incidents', 'id')) FROM generate_series(1, :n)"),
+            {"n": len(records)}
+        ).scalars().all()
+        
+        columns = ["id", *IncidentRecord.__slots__, *COPY_DEFAULTS]
+        buffer = io.StringIO()
+        for incident_id, record in zip(incident_ids, records):
+            values = (incident_id, *_record_values(record), *COPY_DEFAULTS.values())
+            buffer.write("\t".join(_copy_field(value) for value in values))
+            buffer.write("\n")
+        buffer.seek(0)
+        
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY incidents ({', '.join(columns)}) FROM STDIN", buffer)
+        finally:
+            cursor.close()
+        return incident_ids
     
-    async def _send_notification(self, incident: Incident):
+    async def _send_notification(self, incident_id: int, record: IncidentRecord):
         """Send notification about the incident"""
         try:
-            from services.notification_service import NotificationService
-            notification_service = NotificationService()
-            
-            await notification_service.send_incident_notification({
-                "id": incident.id,
-                "incident_type": incident.incident_type,
-                "sub_type": incident.sub_type,
-                "severity": incident.severity,
-                "confidence": incident.confidence,
-                "description": incident.description,
-                "location": incident.location,
-                "timestamp": incident.detection_timestamp,
-                "feed_id": incident.feed_id
+            await self.notifier.send_incident_notification({
+                "id": incident_id,
+                "incident_type": record.incident_type,
+                "sub_type": record.sub_type,
+                "severity": record.severity,
+                "confidence": record.confidence,
+                "description": record.description,
+                "location": record.location,
+                "timestamp": record.detection_timestamp,
+                "feed_id": record.feed_id
             })
             
         except Exception as e:
             self.logger.error(f"Error sending notification: {e}")
     
+    async def analyze_video_file(self, file_path: str) -> List[Dict]:
+        """Detect incidents in a video file in a pool process; raises if decoding fails"""
+        if self._pool is None:
+            # spawn, not fork: CUDA cannot be re-initialized in a forked child
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.file_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool, _worker_process_video, file_path
+        )
+    
     async def process_video_file(self, file_path: str, feed_id: Optional[int] = None) -> List[Dict]:
         """Process a video file for incidents"""
         try:
-            incidents = await self.detector.process_video(file_path)
+            incidents = await self.analyze_video_file(file_path)
             
             # Save incidents to database if feed_id is provided
             if feed_id and incidents:
-                for incident in incidents:
-                    await self._save_incident(incident, feed_id)
+                await self._save_incidents(incidents, feed_id)
             
             return incidents
             
@@ -216,8 +667,7 @@ class VideoProcessor:
             
             # Save incidents to database if feed_id is provided
             if feed_id and incidents:
-                for incident in incidents:
-                    await self._save_incident(incident, feed_id)
+                await self._save_incidents(incidents, feed_id)
             
             return incidents
             
@@ -229,8 +679,8 @@ class VideoProcessor:
         """Get current processing statistics"""
         return {
             **self.processing_stats,
-            "active_feeds": list(self.active_streams.keys()),
-            "timestamp": datetime.utcnow().isoformat()
+            "active_feeds": self._active_feeds,
+            "timestamp": _iso_utc_second(int(time.time()))
         }
     
     async def get_feed_status(self, feed_id: int) -> Dict:
@@ -253,10 +703,31 @@ class VideoProcessor:
                 self.logger.info(f"Cancelled processing for feed {feed_id}")
             
             self.active_streams.clear()
-            self.processing_stats["active_streams"] = 0
+            self._streams_changed()
+            
+            if self._batcher_task:
+                self._batcher_task.cancel()
+                self._batcher_task = None
+                self._batch_q = None
+            
+            # Let a scheduled flush run rather than cancel it mid-write, then
+            # write out what is still buffered and wait for every write in
+            # progress to send its notifications
+            if self._flush_task:
+                await asyncio.gather(self._flush_task, return_exceptions=True)
+                self._flush_task = None
+            await self._flush_incidents()
+            if self._flush_writes:
+                await asyncio.gather(*self._flush_writes, return_exceptions=True)
+            
+            if self._pool:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
             
             # Cleanup detector
             await self.detector.cleanup()
+            if self._owns_notifier:
+                await self.notifier.cleanup()
             
             self.logger.info("Video processor cleaned up")
             
@@ -89,11 +89,12 @@ CREATE TABLE IF NOT EXISTS system_config (
 );
 
 -- Create indexes for better performance
-CREATE INDEX IF NOT EXISTS idx_incidents_type ON incidents(incident_type);
-CREATE INDEX IF NOT EXISTS idx_incidents_severity ON incidents(severity);
 CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON incidents(detection_timestamp);
-CREATE INDEX IF NOT EXISTS idx_incidents_feed_id ON incidents(feed_id);
 CREATE INDEX IF NOT EXISTS idx_incidents_acknowledged ON incidents(acknowledged);
+CREATE INDEX IF NOT EXISTS ix_incidents_feed_ack_ts ON incidents(feed_id, acknowledged, detection_timestamp);
+CREATE INDEX IF NOT EXISTS ix_incidents_type_ts ON incidents(incident_type, detection_timestamp);
+CREATE INDEX IF NOT EXISTS ix_incidents_type_id ON incidents(incident_type, id);
+CREATE INDEX IF NOT EXISTS ix_incidents_severity_id ON incidents(severity, id);
 CREATE INDEX IF NOT EXISTS idx_feeds_active ON cctv_feeds(is_active);
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);